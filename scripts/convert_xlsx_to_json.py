@@ -5,6 +5,9 @@ Convert a single-column XLSX quiz file into JSON.
 Assumes each question starts with a header token (default: lines beginning with
 `TK`) and all following rows up to the next header are the answers/notes.
 
+Uses isal for inflating the XLSX zip and orjson for output when they are
+installed, and falls back to the standard library otherwise.
+
 Usage:
     python scripts/convert_xlsx_to_json.py quizzer.xlsx public/deck.json
 """
@@ -13,12 +16,33 @@ from __future__ import annotations
 
 import argparse
 import json
+import mmap
+import os
 import re
+import string
 import sys
 import zipfile
 import xml.etree.ElementTree as ET
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
-from typing import Iterable, List
+from typing import IO, Dict, Iterable, Iterator, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from isal import isal_zlib
+except ImportError:
+    isal_zlib = None
+
+# A worksheet row maps 0-based column index to cell text; empty cells are omitted.
+Row = Dict[int, str]
+
+# A card is (question, answers); it only becomes a JSON object in dump_cards.
+Card = Tuple[str, List[str]]
 
 
 def col_letter_to_index(col: str) -> int:
@@ -29,66 +53,172 @@ def col_letter_to_index(col: str) -> int:
     return result - 1
 
 
-def load_rows(path: Path, sheet: str = "sheet1") -> List[List[str]]:
-    """Read a worksheet's rows from an XLSX without external deps."""
-    with zipfile.ZipFile(path) as zf:
-        shared: List[str] = []
-        try:
-            root = ET.fromstring(zf.read("xl/sharedStrings.xml"))
-            for si in root:
-                text = "".join(node.text or "" for node in si.iter() if node.tag.endswith("t"))
-                shared.append(text)
-        except KeyError:
-            shared = []
-
-        sheet_xml = f"xl/worksheets/{sheet}.xml"
-        root = ET.fromstring(zf.read(sheet_xml))
-        rows: List[List[str]] = []
-        for row in root.iterfind(".//{*}sheetData/{*}row"):
-            row_data: dict[int, str] = {}
-            max_col = 0
-            for cell in row:
-                ref = cell.get("r", "")
-                # Extract column letters from cell reference (e.g., "A1" -> "A", "AB12" -> "AB")
-                col_letters = "".join(c for c in ref if c.isalpha())
-                if not col_letters:
-                    continue
-                col_idx = col_letter_to_index(col_letters)
-                max_col = max(max_col, col_idx)
-
-                v = cell.find("{*}v")
-                if v is None:
-                    row_data[col_idx] = ""
-                    continue
-                if cell.get("t") == "s":
-                    idx = int(v.text)
-                    row_data[col_idx] = shared[idx] if idx < len(shared) else ""
-                else:
-                    row_data[col_idx] = v.text or ""
-
-            # Build row with proper column positions (fill gaps with empty strings)
-            vals = [row_data.get(i, "") for i in range(max_col + 1)]
-            rows.append(vals)
-        return rows
-
-
-def cells_to_cards(cells: List[str], header_regex: str = r"^TK") -> list[dict]:
-    """Convert a flat list of cells into question/answer cards."""
-    header_re = re.compile(header_regex, flags=re.IGNORECASE)
-    cards: list[dict] = []
-    current: dict | None = None
-    for cell in cells:
-        if header_re.match(cell):
-            if current:
-                cards.append(current)
-            current = {"question": cell, "answers": []}
-        else:
-            if current is None:
-                current = {"question": "Untitled", "answers": []}
-            current["answers"].append(cell)
-    if current:
-        cards.append(current)
-    return cards
+# Column letters repeat on every row, so resolve the 1-2 letter ones (A..ZZ) once.
+_COL_CACHE: dict[str, int] = {
+    prefix + letter: col_letter_to_index(prefix + letter)
+    for prefix in ("", *string.ascii_uppercase)
+    for letter in string.ascii_uppercase
+}
+
+
+def use_isal_inflate() -> bool:
+    """Route zipfile's inflate and CRC through ISA-L when `isal` is installed.
+
+    This swaps zipfile's module-level zlib bindings, so it is only done by the CLI.
+    """
+    if isal_zlib is None:
+        return False
+    zipfile.zlib = isal_zlib
+    zipfile.crc32 = isal_zlib.crc32
+    return True
+
+
+def iterparse_part(source: IO[bytes]) -> Tuple[str, Iterator[Tuple[str, ET.Element]]]:
+    """Start streaming an XML part; return its root namespace ("{uri}" or "") and the events.
+
+    Transitional (Excel's default) and Strict OOXML use different SpreadsheetML
+    namespace URIs, so callers build exact Clark-notation tags from the namespace
+    found here instead of matching a {*} wildcard on every cell.
+    """
+    events = ET.iterparse(source, events=("start", "end"))
+    _, root = next(events)
+    return root.tag[: root.tag.find("}") + 1], events
+
+
+def iter_elements(events: Iterator[Tuple[str, ET.Element]], tag: str) -> Iterator[ET.Element]:
+    """Stream completed elements with the given Clark-notation tag, freeing each after use."""
+    for event, elem in events:
+        if event == "end" and elem.tag == tag:
+            yield elem
+            elem.clear()
+
+
+class _SeekableMmap(mmap.mmap):
+    """mmap that zipfile can read from; mmap only gains seekable() in Python 3.13."""
+
+    def seekable(self) -> bool:
+        return True
+
+
+def load_rows(path: Path, sheet: str = "sheet1") -> List[Row]:
+    """Read a worksheet's rows from an XLSX, streaming entries straight from the zip.
+
+    The archive is memory-mapped so only the pages for the entries actually read
+    are faulted in, without a buffered-I/O copy.
+    """
+    with open(path, "rb") as f:
+        # mmap refuses empty files; report them as the bad archive they are.
+        if os.fstat(f.fileno()).st_size == 0:
+            raise zipfile.BadZipFile("File is not a zip file")
+        with _SeekableMmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, zipfile.ZipFile(mm) as zf:
+            # Shared strings keyed by the index text that cells store in <v>, so a
+            # lookup needs no int() parse or bounds check per cell.
+            shared: dict[str, str] = {}
+            try:
+                strings_fh = zf.open("xl/sharedStrings.xml")
+            except KeyError:
+                strings_fh = None
+            if strings_fh is not None:
+                with strings_fh:
+                    ns, events = iterparse_part(strings_fh)
+                    t_tag = ns + "t"
+                    for si in iter_elements(events, ns + "si"):
+                        # Plain strings are a single <t>; only rich text needs the subtree walk.
+                        if len(si) == 1 and si[0].tag == t_tag:
+                            text = si[0].text or ""
+                        else:
+                            text = "".join(node.text or "" for node in si.iter(t_tag))
+                        shared[str(len(shared))] = text
+
+            sheet_xml = f"xl/worksheets/{sheet}.xml"
+            rows: List[Row] = []
+            with zf.open(sheet_xml) as sheet_fh:
+                ns, events = iterparse_part(sheet_fh)
+                v_tag = ns + "v"
+                for row in iter_elements(events, ns + "row"):
+                    # Sparse row: only cells with a value are stored, keyed by column index.
+                    row_data: Row = {}
+                    col_idx = -1
+                    for cell in row:
+                        # Strip the row number from the cell reference (e.g., "A1" -> "A", "AB12" -> "AB")
+                        col_letters = cell.get("r", "").rstrip("0123456789")
+                        if col_letters:
+                            col_idx = _COL_CACHE.get(col_letters)
+                            if col_idx is None:
+                                col_idx = col_letter_to_index(col_letters)
+                        else:
+                            # Cells without column letters follow on from the previous one.
+                            col_idx += 1
+
+                        v = cell.find(v_tag)
+                        if v is None:
+                            continue
+                        if cell.get("t") == "s":
+                            value = shared.get(v.text)
+                            if value is None:
+                                # Non-canonical index text such as " 7" or "007".
+                                value = shared.get(str(int(v.text)), "")
+                        else:
+                            value = v.text or ""
+                        if value:
+                            row_data[col_idx] = value
+                    rows.append(row_data)
+            return rows
+
+
+_LITERAL_HEADER_RE = re.compile(r"\^([A-Za-z0-9]+)")
+
+
+@lru_cache(maxsize=8)
+def compile_header(header_regex: str) -> Tuple[str | None, re.Pattern[str]]:
+    """Compile `header_regex` once per pattern.
+
+    Also returns the lowercased prefix when the pattern is just ^ plus letters/digits,
+    so callers can use a slice compare instead of the regex engine.
+    """
+    m = _LITERAL_HEADER_RE.fullmatch(header_regex)
+    prefix = m.group(1).lower() if m else None
+    return prefix, re.compile(header_regex, flags=re.IGNORECASE)
+
+
+def rows_to_cards(rows: List[Row], num_cols: int, header_regex: str = r"^TK") -> List[Card]:
+    """Group each column's stripped, non-empty cells into cards in a single pass over the rows.
+
+    Cells before a column's first header go into an "Untitled" card.
+    """
+    prefix, header_re = compile_header(header_regex)
+    prefix_len = len(prefix) if prefix is not None else 0
+    col_cards: List[List[Card]] = [[] for _ in range(num_cols)]
+    col_answers: List[List[str] | None] = [None] * num_cols
+    for row in rows:
+        for col_idx, cell in row.items():
+            cell = cell.strip()
+            if not cell:
+                continue
+            if prefix is not None:
+                is_header = cell[:prefix_len].lower() == prefix
+            else:
+                is_header = header_re.match(cell) is not None
+            if is_header:
+                answers = col_answers[col_idx] = []
+                col_cards[col_idx].append((cell, answers))
+            else:
+                answers = col_answers[col_idx]
+                if answers is None:
+                    answers = col_answers[col_idx] = []
+                    col_cards[col_idx].append(("Untitled", answers))
+                answers.append(cell)
+    return list(chain.from_iterable(col_cards))
+
+
+def dump_cards(cards: List[Card], pretty: bool = False) -> bytes:
+    """Serialize cards to UTF-8 JSON (compact unless `pretty`), using orjson when installed."""
+    deck = [{"question": question, "answers": answers} for question, answers in cards]
+    if orjson is not None:
+        return orjson.dumps(deck, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(deck, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(deck, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
 
 def main(argv: list[str]) -> int:
@@ -111,29 +241,25 @@ def main(argv: list[str]) -> int:
         default="sheet1",
         help="Worksheet XML name (sheet1, sheet2...). Default: sheet1",
     )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Indent the JSON output for human reading. Default: compact",
+    )
     args = parser.parse_args(argv)
 
+    use_isal_inflate()
     rows = load_rows(args.xlsx_path, sheet=args.sheet)
 
     # Determine the number of columns
-    num_cols = max(len(row) for row in rows) if rows else 0
-
-    # Process each column independently to avoid mixing answers between questions
-    all_cards: list[dict] = []
-    for col_idx in range(num_cols):
-        # Extract just this column's cells as a flat list
-        col_cells: List[str] = []
-        for row in rows:
-            if len(row) > col_idx:
-                cell = (row[col_idx] or "").strip()
-                if cell:
-                    col_cells.append(cell)
-        # Parse questions/answers from this column's isolated data
-        col_cards = cells_to_cards(col_cells, header_regex=args.header_pattern)
-        all_cards.extend(col_cards)
+    num_cols = max((max(row) + 1 for row in rows if row), default=0)
+
+    # Process each column independently to avoid mixing answers between questions;
+    # cards are grouped in the same pass that walks the rows.
+    all_cards = rows_to_cards(rows, num_cols, header_regex=args.header_pattern)
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
-    args.output.write_text(json.dumps(all_cards, indent=2), encoding="utf-8")
+    args.output.write_bytes(dump_cards(all_cards, pretty=args.pretty))
     print(f"Wrote {len(all_cards)} cards to {args.output}")
     return 0
 